@@ -27,6 +27,7 @@ from app.services.payment_verification_service import (
     method_display_name,
     run_manual_check,
 )
+from app.utils.cache import SavedCardsCache
 from app.utils.currency_converter import currency_converter
 
 from ..dependencies import get_cabinet_db, get_current_cabinet_user
@@ -1246,19 +1247,14 @@ async def get_saved_cards(
     if not recurrent_enabled:
         return SavedCardsListResponse(cards=[], recurrent_enabled=False)
 
+    cached_cards = await SavedCardsCache.get_cards(user.id)
+    if cached_cards is not None:
+        return SavedCardsListResponse(cards=cached_cards, recurrent_enabled=True)
+
     methods = await get_active_payment_methods_by_user(db, user.id)
 
-    cards = [
-        SavedCardResponse(
-            id=m.id,
-            method_type=m.method_type,
-            card_last4=m.card_last4,
-            card_type=m.card_type,
-            title=m.title,
-            created_at=m.created_at,
-        )
-        for m in methods
-    ]
+    cards = [SavedCardResponse.model_validate(m) for m in methods]
+    await SavedCardsCache.set_cards(user.id, [card.model_dump(mode='json') for card in cards])
 
     return SavedCardsListResponse(cards=cards, recurrent_enabled=True)
 
@@ -1284,4 +1280,6 @@ async def delete_saved_card(
             detail='Saved card not found',
         )
 
+    await SavedCardsCache.invalidate(user.id)
+
     return {'success': True, 'message': 'Card unlinked successfully'}
@@ -1,8 +1,9 @@
-from datetime import UTC, datetime
+from collections import defaultdict
+from collections.abc import Iterable
 
 import structlog
-from sqlalchemy import select, update
-from sqlalchemy.exc import IntegrityError
+from sqlalchemy import func, select, true, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database.models import SavedPaymentMethod
@@ -41,7 +42,7 @@ async def create_saved_payment_method(
             card_expiry_month=card_expiry_month,
             card_expiry_year=card_expiry_year,
             title=title,
-            updated_at=datetime.now(UTC),
+            updated_at=func.now(),
         )
         .returning(SavedPaymentMethod)
     )
@@ -57,31 +58,33 @@ async def create_saved_payment_method(
         )
         return reactivated
 
-    method = SavedPaymentMethod(
-        user_id=user_id,
-        yookassa_payment_method_id=yookassa_payment_method_id,
-        method_type=method_type,
-        card_first6=card_first6,
-        card_last4=card_last4,
-        card_type=card_type,
-        card_expiry_month=card_expiry_month,
-        card_expiry_year=card_expiry_year,
-        title=title,
+    # ON CONFLICT вместо перехвата IntegrityError: конфликт не откатывает транзакцию вызывающего кода
+    result = await db.execute(
+        pg_insert(SavedPaymentMethod)
+        .values(
+            user_id=user_id,
+            yookassa_payment_method_id=yookassa_payment_method_id,
+            method_type=method_type,
+            card_first6=card_first6,
+            card_last4=card_last4,
+            card_type=card_type,
+            card_expiry_month=card_expiry_month,
+            card_expiry_year=card_expiry_year,
+            title=title,
+        )
+        .on_conflict_do_nothing(index_elements=[SavedPaymentMethod.yookassa_payment_method_id])
+        .returning(SavedPaymentMethod)
     )
-
-    db.add(method)
-    try:
-        await db.commit()
-    except IntegrityError as e:
-        await db.rollback()
+    method = result.scalar_one_or_none()
+    if method is None:
+        # Метод с таким YooKassa ID уже привязан к другому пользователю
         logger.error(
-            'Ошибка создания сохранённого метода оплаты',
+            'Ошибка создания сохранённого метода оплаты: метод уже существует',
             yookassa_payment_method_id=yookassa_payment_method_id,
             user_id=user_id,
-            e=e,
         )
         return None
-    await db.refresh(method)
+    await db.commit()
 
     logger.info(
         'Создан сохранённый метод оплаты',
@@ -102,13 +105,72 @@ async def get_active_payment_methods_by_user(
         select(SavedPaymentMethod)
         .where(
             SavedPaymentMethod.user_id == user_id,
-            SavedPaymentMethod.is_active == True,
+            SavedPaymentMethod.is_active == true(),
         )
         .order_by(SavedPaymentMethod.created_at.desc())
     )
     return list(result.scalars().all())
 
 
+async def get_active_payment_method_with_count(
+    db: AsyncSession,
+    saved_method_id: int,
+    user_id: int,
+) -> tuple[SavedPaymentMethod | None, int]:
+    """Найти активный метод оплаты пользователя по id одним запросом.
+
+    Возвращает метод (None, если он не найден или принадлежит другому пользователю)
+    и общее количество активных методов пользователя.
+    """
+    active_count = (
+        select(func.count())
+        .select_from(SavedPaymentMethod)
+        .where(
+            SavedPaymentMethod.user_id == user_id,
+            SavedPaymentMethod.is_active == true(),
+        )
+        .scalar_subquery()
+    )
+    result = await db.execute(
+        select(SavedPaymentMethod, active_count)
+        .where(
+            SavedPaymentMethod.id == saved_method_id,
+            SavedPaymentMethod.user_id == user_id,
+            SavedPaymentMethod.is_active == true(),
+        )
+        .limit(1)
+    )
+    row = result.first()
+    if row is None:
+        return None, 0
+    return row[0], row[1]
+
+
+async def get_active_payment_methods_by_users(
+    db: AsyncSession,
+    user_ids: Iterable[int],
+) -> dict[int, list[SavedPaymentMethod]]:
+    """Получить активные методы оплаты сразу для нескольких пользователей одним запросом.
+
+    Методы каждого пользователя упорядочены от новых к старым, как в get_active_payment_methods_by_user.
+    """
+    user_ids = list(user_ids)
+    if not user_ids:
+        return {}
+    result = await db.execute(
+        select(SavedPaymentMethod)
+        .where(
+            SavedPaymentMethod.user_id.in_(user_ids),
+            SavedPaymentMethod.is_active == true(),
+        )
+        .order_by(SavedPaymentMethod.created_at.desc())
+    )
+    methods_by_user: dict[int, list[SavedPaymentMethod]] = defaultdict(list)
+    for method in result.scalars().all():
+        methods_by_user[method.user_id].append(method)
+    return dict(methods_by_user)
+
+
 async def get_user_ids_with_active_payment_methods(
     db: AsyncSession,
     user_ids: list[int],
@@ -120,7 +182,7 @@ async def get_user_ids_with_active_payment_methods(
         select(SavedPaymentMethod.user_id)
         .where(
             SavedPaymentMethod.user_id.in_(user_ids),
-            SavedPaymentMethod.is_active == True,
+            SavedPaymentMethod.is_active == true(),
         )
         .distinct()
     )
@@ -137,7 +199,7 @@ async def get_payment_method_by_yookassa_id(
         SavedPaymentMethod.yookassa_payment_method_id == yookassa_payment_method_id,
     )
     if not include_inactive:
-        query = query.where(SavedPaymentMethod.is_active == True)
+        query = query.where(SavedPaymentMethod.is_active == true())
     result = await db.execute(query)
     return result.scalar_one_or_none()
 
@@ -153,13 +215,15 @@ async def deactivate_payment_method(
         .where(
             SavedPaymentMethod.id == saved_method_id,
             SavedPaymentMethod.user_id == user_id,
-            SavedPaymentMethod.is_active == True,
+            SavedPaymentMethod.is_active == true(),
         )
-        .values(is_active=False, updated_at=datetime.now(UTC))
+        .values(is_active=False, updated_at=func.now())
+        .returning(SavedPaymentMethod.id)
     )
+    deactivated = result.first()
     await db.commit()
 
-    if result.rowcount > 0:
+    if deactivated is not None:
         logger.info(
             'Метод оплаты деактивирован',
             saved_method_id=saved_method_id,
@@ -178,9 +242,10 @@ async def deactivate_all_user_payment_methods(
         update(SavedPaymentMethod)
         .where(
             SavedPaymentMethod.user_id == user_id,
-            SavedPaymentMethod.is_active == True,
+            SavedPaymentMethod.is_active == true(),
         )
-        .values(is_active=False, updated_at=datetime.now(UTC))
+        .values(is_active=False, updated_at=func.now())
+        .execution_options(synchronize_session=False)
     )
     await db.commit()
 
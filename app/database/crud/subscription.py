@@ -2,7 +2,7 @@ from collections.abc import Iterable
 from datetime import UTC, datetime, timedelta
 
 import structlog
-from sqlalchemy import and_, delete, func, select
+from sqlalchemy import and_, delete, false, func, select, true
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 from sqlalchemy.orm.exc import StaleDataError
@@ -941,8 +941,8 @@ async def get_subscriptions_for_autopay(db: AsyncSession) -> list[Subscription]:
             and_(
                 Subscription.status == SubscriptionStatus.ACTIVE.value,
                 User.status == UserStatus.ACTIVE.value,
-                Subscription.autopay_enabled == True,
-                Subscription.is_trial == False,
+                Subscription.autopay_enabled == true(),
+                Subscription.is_trial == false(),
             )
         )
     )
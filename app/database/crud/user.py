@@ -537,21 +537,27 @@ async def add_user_balance_by_id(
         return False
 
 
-async def lock_user_for_pricing(db: AsyncSession, user_id: int) -> User:
+async def lock_user_for_pricing(db: AsyncSession, user_id: int, *, load_subscription: bool = True) -> User:
     """Lock user row with FOR UPDATE and return refreshed instance.
 
     Call BEFORE computing prices that depend on promo offer state
     to prevent TOCTOU race conditions where two concurrent requests
     both read the same promo offer discount and charge a discounted price.
+
+    Pass load_subscription=False when the caller already holds the subscription
+    with its tariff (e.g. batch-loaded) to skip reloading them per user.
     """
+    options = [
+        selectinload(User.user_promo_groups).selectinload(UserPromoGroup.promo_group),
+        selectinload(User.promo_group),
+    ]
+    if load_subscription:
+        options.append(selectinload(User.subscription).selectinload(Subscription.tariff))
+
     result = await db.execute(
         select(User)
         .where(User.id == user_id)
-        .options(
-            selectinload(User.user_promo_groups).selectinload(UserPromoGroup.promo_group),
-            selectinload(User.promo_group),
-            selectinload(User.subscription).selectinload(Subscription.tariff),
-        )
+        .options(*options)
         .with_for_update()
         .execution_options(populate_existing=True)
     )
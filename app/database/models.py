@@ -195,6 +195,10 @@ class WheelSpinPaymentType(Enum):
 
 class YooKassaPayment(Base):
     __tablename__ = 'yookassa_payments'
+    __table_args__ = (
+        Index('ix_yookassa_payments_user_created', 'user_id', text('created_at DESC')),
+        Index('ix_yookassa_payments_transaction_id', 'transaction_id'),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'), nullable=True)
@@ -244,7 +248,14 @@ class YooKassaPayment(Base):
 
 class SavedPaymentMethod(Base):
     __tablename__ = 'saved_payment_methods'
-    __table_args__ = (Index('ix_saved_payment_methods_user_active', 'user_id', 'is_active'),)
+    __table_args__ = (
+        Index(
+            'ix_saved_payment_methods_user_active_recent',
+            'user_id',
+            text('created_at DESC'),
+            postgresql_where=text('is_active = true'),
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey('users.id'), nullable=False, index=True)
@@ -1332,6 +1343,11 @@ class Subscription(Base):
     __table_args__ = (
         Index('ix_subscriptions_status_trial', 'status', 'is_trial'),
         Index('ix_subscriptions_trial_created', 'is_trial', 'created_at'),
+        Index(
+            'ix_subscriptions_autopay_due',
+            'end_date',
+            postgresql_where=text("status = 'active' AND autopay_enabled = true"),
+        ),
     )
 
     id = Column(Integer, primary_key=True, index=True)
@@ -6,6 +6,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.config import settings
 from app.database.crud.saved_payment_method import (
     deactivate_payment_method,
+    get_active_payment_method_with_count,
     get_active_payment_methods_by_user,
 )
 from app.database.crud.subscription import update_subscription_autopay
@@ -27,6 +28,7 @@ from app.services.subscription_checkout_service import (
 )
 from app.services.user_cart_service import user_cart_service
 from app.states import SubscriptionStates
+from app.utils.cache import SavedCardsCache
 
 from .countries import (
     _build_countries_selection_text,
@@ -178,8 +180,7 @@ async def handle_unlink_card(callback: types.CallbackQuery, db_user: User, db: A
     texts = get_texts(db_user.language)
     card_id = int(callback.data.split('_')[-1])
 
-    cards = await get_active_payment_methods_by_user(db, db_user.id)
-    card = next((c for c in cards if c.id == card_id), None)
+    card, active_cards_count = await get_active_payment_method_with_count(db, card_id, db_user.id)
 
     if not card:
         await callback.answer(
@@ -195,7 +196,7 @@ async def handle_unlink_card(callback: types.CallbackQuery, db_user: User, db: A
         'После отвязки автоплатеж не сможет использовать эту карту.',
     ).format(card=card_label)
 
-    if len(cards) == 1:
+    if active_cards_count == 1:
         text += texts.t(
             'SAVED_CARDS_LAST_CARD_WARNING',
             '\n\n⚠️ <b>Внимание:</b> это ваша последняя привязанная карта. '
@@ -217,6 +218,7 @@ async def handle_confirm_unlink(callback: types.CallbackQuery, db_user: User, db
     success = await deactivate_payment_method(db, card_id, db_user.id)
 
     if success:
+        await SavedCardsCache.invalidate(db_user.id)
         await callback.answer(
             texts.t('SAVED_CARDS_UNLINKED', '✅ Карта отвязана'),
         )
@@ -1,5 +1,7 @@
 import asyncio
 import html
+import math
+import time
 from datetime import UTC, datetime, timedelta
 from pathlib import Path
 from typing import Any
@@ -82,6 +84,18 @@ logger = structlog.get_logger(__name__)
 LOGO_PATH = Path(settings.LOGO_FILE)
 
 
+def _next_run_deadline(previous_deadline: float, now: float, interval_seconds: float) -> float:
+    """Следующий момент запуска по монотонным часам.
+
+    Если цикл длился дольше интервала, пропущенные запуски не догоняем —
+    переходим к ближайшему будущему моменту сетки.
+    """
+    next_run_at = previous_deadline + interval_seconds
+    if next_run_at < now:
+        next_run_at += math.ceil((now - next_run_at) / interval_seconds) * interval_seconds
+    return next_run_at
+
+
 class MonitoringService:
     def __init__(self, bot=None):
         self.is_running = False
@@ -90,6 +104,10 @@ class MonitoringService:
         self._notified_users: set[str] = set()
         self._last_cleanup = datetime.now(UTC)
         self._sla_task = None
+        self._stop_event = asyncio.Event()
+        self._loop_task: asyncio.Task | None = None
+        self._recurrent_payment_service = None
+        self._recurrent_payment_credentials: tuple | None = None
 
     async def _send_message_with_logo(
         self,
@@ -175,6 +193,12 @@ class MonitoringService:
             return
 
         self.is_running = True
+        # У каждого запуска своё событие остановки: цикл, остановленный посреди долгого
+        # _monitoring_cycle, не продолжит работу после повторного запуска
+        stop_event = asyncio.Event()
+        self._stop_event = stop_event
+        previous_loop = self._loop_task
+        self._loop_task = asyncio.current_task()
         logger.info('🔄 Запуск службы мониторинга')
         # Start dedicated SLA loop with its own interval for timely 5-min checks
         try:
@@ -183,17 +207,61 @@ class MonitoringService:
         except Exception as e:
             logger.error('Не удалось запустить SLA-мониторинг', error=e)
 
-        while self.is_running:
+        if previous_loop and previous_loop is not self._loop_task and not previous_loop.done():
+            # Дожидаемся последнего цикла предыдущего запуска, чтобы циклы не шли параллельно
+            await asyncio.wait({previous_loop})
+
+        # Запуски привязаны к монотонным часам от старта: интервал не «уплывает»
+        # на длительность самого цикла
+        next_run_at = time.monotonic()
+        while not stop_event.is_set():
             try:
                 await self._monitoring_cycle()
-                await asyncio.sleep(settings.MONITORING_INTERVAL * 60)
+
+                interval_seconds = max(1, settings.MONITORING_INTERVAL * 60)
+                next_run_at = _next_run_deadline(next_run_at, time.monotonic(), interval_seconds)
 
             except Exception as e:
                 logger.error('Ошибка в цикле мониторинга', error=e)
-                await asyncio.sleep(60)
+                next_run_at = time.monotonic() + 60
+
+            if await self._wait_for_stop(stop_event, next_run_at - time.monotonic()):
+                break
+
+    @staticmethod
+    async def _wait_for_stop(stop_event: asyncio.Event, timeout: float) -> bool:
+        """Ждёт timeout секунд или сигнала остановки. Возвращает True, если мониторинг остановлен."""
+        try:
+            await asyncio.wait_for(stop_event.wait(), timeout=max(0.0, timeout))
+        except TimeoutError:
+            pass
+        return stop_event.is_set()
+
+    def _get_recurrent_payment_service(self):
+        """Возвращает PaymentService для рекуррентных платежей.
+
+        Сервис пересоздаётся при смене бота, если YooKassa не сконфигурирована, а также
+        при изменении реквизитов YooKassa в настройках — SDK конфигурируется только в конструкторе.
+        """
+        credentials = (settings.YOOKASSA_SHOP_ID, settings.YOOKASSA_SECRET_KEY, settings.YOOKASSA_RETURN_URL)
+        service = self._recurrent_payment_service
+        if (
+            service is None
+            or service.bot is not self.bot
+            or self._recurrent_payment_credentials != credentials
+            or not service.yookassa_service
+            or not service.yookassa_service.configured
+        ):
+            from app.services.payment_service import PaymentService
+
+            service = PaymentService(self.bot)
+            self._recurrent_payment_service = service
+            self._recurrent_payment_credentials = credentials
+        return service
 
     def stop_monitoring(self):
         self.is_running = False
+        self._stop_event.set()
         logger.info('ℹ️ Мониторинг остановлен')
         try:
             if self._sla_task and not self._sla_task.done():
@@ -232,7 +300,11 @@ class MonitoringService:
                     try:
                         from app.services.recurrent_payment_service import process_recurrent_payments
 
-                        await process_recurrent_payments(db=db, bot=self.bot)
+                        await process_recurrent_payments(
+                            db=db,
+                            bot=self.bot,
+                            payment_service=self._get_recurrent_payment_service(),
+                        )
                     except Exception as recurrent_error:
                         logger.error(
                             'Ошибка рекуррентных автоплатежей',
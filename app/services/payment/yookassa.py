@@ -1211,6 +1211,9 @@ class YooKassaPaymentMixin:
             )
 
             if saved:
+                from app.utils.cache import SavedCardsCache
+
+                await SavedCardsCache.invalidate(payment.user_id)
                 logger.info(
                     'Метод оплаты сохранён для рекуррентных платежей',
                     saved_method_id=saved.id,
@@ -7,27 +7,44 @@ monitoring_service затем спишет баланс и продлит под
 
 from __future__ import annotations
 
+import asyncio
+from collections.abc import AsyncIterator
 from dataclasses import dataclass, field
 from datetime import UTC, datetime, timedelta
 
 import structlog
 from aiogram import Bot
 from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
-from sqlalchemy import and_, or_, select
+from sqlalchemy import and_, false, func, literal, or_, select, true, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
 from app.config import settings
+from app.database.crud.saved_payment_method import get_active_payment_methods_by_users
+from app.database.crud.user import lock_user_for_pricing
+from app.database.crud.yookassa import create_yookassa_payment
+from app.database.database import AsyncSessionLocal
 from app.database.models import (
+    SavedPaymentMethod,
     Subscription,
     SubscriptionStatus,
     User,
-    UserPromoGroup,
 )
+from app.localization.texts import get_texts
+from app.services.payment_service import PaymentService
+from app.services.pricing_engine import pricing_engine
+from app.services.subscription_service import SubscriptionService
 
 
 logger = structlog.get_logger(__name__)
 
+# Размер пачки подписок, выбираемой за один запрос
+_TOPUP_BATCH_SIZE = 200
+
+# Параллельность и пауза между уведомлениями: не больше ~25 сообщений в секунду (лимит Telegram — 30)
+_NOTIFY_CONCURRENCY = 5
+_NOTIFY_DELAY_SECONDS = 0.2
+
 
 @dataclass
 class _DailyGuard:
@@ -52,6 +69,36 @@ class _DailyGuard:
 _daily_guard = _DailyGuard()
 
 
+class _Notifier:
+    """Отправляет уведомления пользователям в фоне, чтобы списания не ждали ответа Telegram."""
+
+    def __init__(self, bot: Bot) -> None:
+        self._bot = bot
+        self._semaphore = asyncio.Semaphore(_NOTIFY_CONCURRENCY)
+        self._tasks: list[asyncio.Task] = []
+
+    def send(self, chat_id: int, text: str, keyboard: InlineKeyboardMarkup, error_message: str) -> None:
+        self._tasks.append(asyncio.create_task(self._send(chat_id, text, keyboard, error_message)))
+
+    async def _send(self, chat_id: int, text: str, keyboard: InlineKeyboardMarkup, error_message: str) -> None:
+        async with self._semaphore:
+            try:
+                await self._bot.send_message(
+                    chat_id=chat_id,
+                    text=text,
+                    parse_mode='HTML',
+                    reply_markup=keyboard,
+                )
+            except Exception as notify_error:
+                logger.warning(error_message, notify_error=notify_error)
+            await asyncio.sleep(_NOTIFY_DELAY_SECONDS)
+
+    async def flush(self) -> None:
+        """Дожидается отправки всех поставленных уведомлений."""
+        tasks, self._tasks = self._tasks, []
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
 def _build_extend_keyboard(texts) -> InlineKeyboardMarkup:
     """Клавиатура с кнопкой продления подписки для уведомлений."""
     return InlineKeyboardMarkup(
@@ -66,14 +113,21 @@ def _build_extend_keyboard(texts) -> InlineKeyboardMarkup:
     )
 
 
-async def process_recurrent_payments(db: AsyncSession, bot: Bot | None = None) -> dict:
+async def process_recurrent_payments(
+    db: AsyncSession,
+    bot: Bot | None = None,
+    payment_service: PaymentService | None = None,
+) -> dict:
     """
     Основная функция: находит подписки, которым скоро нужно продление,
     у которых недостаточно баланса, и пополняет баланс с сохранённой карты.
 
     Args:
-        db: Сессия БД из вызывающего кода (_monitoring_cycle)
+        db: Сессия БД из вызывающего кода (_monitoring_cycle), используется для выборки подписок.
+            Каждая подписка обрабатывается в собственной сессии, параллельно не более
+            YOOKASSA_RECURRENT_CONCURRENCY подписок.
         bot: Экземпляр бота для уведомлений
+        payment_service: Переиспользуемый PaymentService; если не передан, создаётся на один цикл
 
     Returns:
         dict: Статистика обработки
@@ -99,58 +153,32 @@ async def process_recurrent_payments(db: AsyncSession, bot: Bot | None = None) -
     }
 
     # Создаём сервисы один раз для всех подписок
-    from app.services.payment_service import PaymentService
-    from app.services.subscription_service import SubscriptionService
-
-    payment_service = PaymentService()
+    if payment_service is None:
+        payment_service = PaymentService(bot)
     subscription_service = SubscriptionService()
 
-    try:
-        subscriptions = await _find_subscriptions_needing_topup(db)
-        stats['checked'] = len(subscriptions)
-
-        for subscription in subscriptions:
-            user = subscription.user
-            if not user:
-                continue
-
-            guard_key = f'{user.id}_{subscription.id}'
-            if _daily_guard.is_processed(guard_key):
-                stats['already_processed'] += 1
-                continue
+    semaphore = asyncio.Semaphore(max(1, settings.YOOKASSA_RECURRENT_CONCURRENCY))
+    notifier = _Notifier(bot) if bot else None
 
-            try:
-                result = await _process_single_subscription(
-                    db,
-                    subscription,
-                    user,
-                    bot,
-                    payment_service,
-                    subscription_service,
-                )
-                if result == 'created':
-                    stats['payments_created'] += 1
-                    _daily_guard.mark_processed(guard_key)
-                elif result == 'no_card':
-                    stats['insufficient_no_card'] += 1
-                    _daily_guard.mark_processed(guard_key)
-                elif result == 'all_cards_failed':
-                    stats['all_cards_failed'] += 1
-                    _daily_guard.mark_processed(guard_key)
-                elif result == 'skipped':
-                    stats['already_processed'] += 1
-            except Exception as e:
-                stats['errors'] += 1
-                logger.error(
-                    'Ошибка обработки рекуррентного платежа',
-                    subscription_id=subscription.id,
-                    user_id=user.id,
-                    error=e,
-                    exc_info=True,
-                )
+    try:
+        async for subscriptions in _iter_subscriptions_needing_topup(db):
+            stats['checked'] += len(subscriptions)
+            await _process_batch(
+                db,
+                subscriptions,
+                notifier,
+                payment_service,
+                subscription_service,
+                semaphore,
+                stats,
+            )
     except Exception as e:
         logger.error('Ошибка получения подписок для рекуррентных платежей', error=e, exc_info=True)
         stats['errors'] += 1
+    finally:
+        # Уведомления отправляются в фоне — дожидаемся их до завершения цикла
+        if notifier:
+            await notifier.flush()
 
     if stats['payments_created'] > 0 or stats['errors'] > 0:
         logger.info('Рекуррентные платежи: итоги', **stats)
@@ -158,23 +186,106 @@ async def process_recurrent_payments(db: AsyncSession, bot: Bot | None = None) -
     return stats
 
 
-async def _find_subscriptions_needing_topup(db: AsyncSession) -> list:
-    """Находит подписки с autopay, которым скоро нужно продление."""
+async def _process_batch(
+    db: AsyncSession,
+    subscriptions: list[Subscription],
+    notifier: _Notifier | None,
+    payment_service,
+    subscription_service,
+    semaphore: asyncio.Semaphore,
+    stats: dict,
+) -> None:
+    """Параллельно обрабатывает пачку подписок и обновляет статистику."""
+    # Сохранённые карты всех пользователей пачки одним запросом вместо запроса на каждую подписку
+    methods_by_user = await get_active_payment_methods_by_users(db, {s.user_id for s in subscriptions})
+    # Завершаем читающую транзакцию: пока задачи работают в своих сессиях, внешняя сессия
+    # не должна висеть idle in transaction (idle_in_transaction_session_timeout разорвёт соединение).
+    # expire_on_commit=False — загруженные подписки и карты остаются доступными
+    await db.commit()
+
+    pending: list[tuple[Subscription, User, str]] = []
+    for subscription in subscriptions:
+        user = subscription.user
+        if not user:
+            continue
+
+        guard_key = f'{user.id}_{subscription.id}'
+        if _daily_guard.is_processed(guard_key):
+            stats['already_processed'] += 1
+            continue
+
+        pending.append((subscription, user, guard_key))
+
+    async def _run(subscription: Subscription, user: User) -> str:
+        async with semaphore:
+            # AsyncSession нельзя использовать конкурентно — у каждой задачи своя сессия
+            async with AsyncSessionLocal() as task_db:
+                return await _process_single_subscription(
+                    task_db,
+                    subscription,
+                    user,
+                    notifier,
+                    payment_service,
+                    subscription_service,
+                    methods_by_user.get(user.id, []),
+                )
+
+    results = await asyncio.gather(
+        *(_run(subscription, user) for subscription, user, _ in pending),
+        return_exceptions=True,
+    )
+
+    for (subscription, user, guard_key), result in zip(pending, results, strict=True):
+        if isinstance(result, BaseException):
+            stats['errors'] += 1
+            logger.error(
+                'Ошибка обработки рекуррентного платежа',
+                subscription_id=subscription.id,
+                user_id=user.id,
+                error=result,
+                exc_info=result,
+            )
+        elif result == 'created':
+            stats['payments_created'] += 1
+            _daily_guard.mark_processed(guard_key)
+        elif result == 'no_card':
+            stats['insufficient_no_card'] += 1
+            _daily_guard.mark_processed(guard_key)
+        elif result == 'all_cards_failed':
+            stats['all_cards_failed'] += 1
+            _daily_guard.mark_processed(guard_key)
+        elif result == 'skipped':
+            stats['already_processed'] += 1
+
+
+async def _iter_subscriptions_needing_topup(db: AsyncSession) -> AsyncIterator[list[Subscription]]:
+    """Находит подписки с autopay, которым скоро нужно продление, пачками по _TOPUP_BATCH_SIZE.
+
+    Окно autopay_days_before каждой подписки проверяется в SQL, чтобы не
+    выгружать все подписки с autopay и не фильтровать их в Python. Окно при этом
+    не шире DEFAULT_AUTOPAY_DAYS_BEFORE + 1 дней: постоянная граница по end_date
+    ещё и позволяет сканировать ix_subscriptions_autopay_due по диапазону.
+    Пачки читаются keyset-пагинацией по (end_date, id), поэтому память не растёт
+    с числом подписок, а первые списания начинаются до выборки всех кандидатов.
+    """
     current_time = datetime.now(UTC)
-    max_days_before = settings.DEFAULT_AUTOPAY_DAYS_BEFORE
 
-    # Максимальный горизонт проверки
-    check_horizon = current_time + timedelta(days=max_days_before + 1)
+    # autopay_days_before = 0/NULL трактуется как значение по умолчанию
+    days_before = func.coalesce(
+        func.nullif(Subscription.autopay_days_before, 0),
+        settings.DEFAULT_AUTOPAY_DAYS_BEFORE,
+    )
+    renewal_horizon = literal(current_time, Subscription.end_date.type) + func.make_interval(0, 0, 0, days_before)
+    check_horizon = current_time + timedelta(days=settings.DEFAULT_AUTOPAY_DAYS_BEFORE + 1)
 
     recently_expired_threshold = current_time - timedelta(hours=48)
 
-    result = await db.execute(
+    base_query = (
         select(Subscription)
         .options(
-            selectinload(Subscription.user).options(
-                selectinload(User.promo_group),
-                selectinload(User.user_promo_groups).selectinload(UserPromoGroup.promo_group),
-            ),
+            # Пользователь перечитывается с блокировкой (и промогруппами) в lock_user_for_pricing,
+            # здесь нужен только его id
+            selectinload(Subscription.user).load_only(User.id),
             selectinload(Subscription.tariff),
         )
         .where(
@@ -183,27 +294,47 @@ async def _find_subscriptions_needing_topup(db: AsyncSession) -> list:
                     and_(
                         Subscription.status == SubscriptionStatus.ACTIVE.value,
                         Subscription.end_date <= check_horizon,
+                        Subscription.end_date <= renewal_horizon,
                     ),
                     and_(
                         Subscription.status == SubscriptionStatus.EXPIRED.value,
                         Subscription.end_date >= recently_expired_threshold,
                     ),
                 ),
-                Subscription.autopay_enabled == True,
-                Subscription.is_trial == False,
+                Subscription.autopay_enabled == true(),
+                Subscription.is_trial == false(),
             )
         )
+        .order_by(Subscription.end_date, Subscription.id)
+        .limit(_TOPUP_BATCH_SIZE)
     )
-    return list(result.scalars().all())
+
+    last_key: tuple[datetime, int] | None = None
+    while True:
+        query = base_query
+        if last_key is not None:
+            query = query.where(tuple_(Subscription.end_date, Subscription.id) > last_key)
+
+        result = await db.execute(query)
+        batch = list(result.scalars().all())
+        if not batch:
+            return
+
+        yield batch
+
+        if len(batch) < _TOPUP_BATCH_SIZE:
+            return
+        last_key = (batch[-1].end_date, batch[-1].id)
 
 
 async def _process_single_subscription(
     db: AsyncSession,
     subscription: Subscription,
     user: User,
-    bot: Bot | None,
+    notifier: _Notifier | None,
     payment_service,
     subscription_service,
+    saved_methods: list[SavedPaymentMethod],
 ) -> str:
     """
     Обрабатывает одну подписку: проверяет баланс, находит карту, создаёт автоплатёж.
@@ -214,8 +345,6 @@ async def _process_single_subscription(
         'all_cards_failed' — все карты не сработали
         'skipped' — баланс достаточен или другая причина пропуска
     """
-    from app.database.crud.saved_payment_method import get_active_payment_methods_by_user
-
     # Рассчитываем стоимость продления
     tariff = getattr(subscription, 'tariff', None)
     if tariff:
@@ -224,11 +353,9 @@ async def _process_single_subscription(
         autopay_period = 30
 
     try:
-        from app.database.crud.user import lock_user_for_pricing
-        from app.services.pricing_engine import pricing_engine
-
-        # TOCTOU: lock user row before pricing to prevent concurrent promo/balance races
-        user = await lock_user_for_pricing(db, user.id)
+        # TOCTOU: lock user row before pricing to prevent concurrent promo/balance races.
+        # Subscription tariffs are already batch-loaded by _iter_subscriptions_needing_topup.
+        user = await lock_user_for_pricing(db, user.id, load_subscription=False)
 
         pricing = await pricing_engine.calculate_renewal_price(
             db,
@@ -255,14 +382,7 @@ async def _process_single_subscription(
         # Баланса достаточно, обычный autopay справится
         return 'skipped'
 
-    # Используем autopay_days_before конкретной подписки, если задан
-    days_before = getattr(subscription, 'autopay_days_before', None) or settings.DEFAULT_AUTOPAY_DAYS_BEFORE
-    days_until_expiry = (subscription.end_date - datetime.now(UTC)).total_seconds() / 86400
-    if days_until_expiry > days_before and subscription.status != SubscriptionStatus.EXPIRED.value:
-        return 'skipped'
-
-    # Нужно пополнить баланс — ищем сохранённую карту
-    saved_methods = await get_active_payment_methods_by_user(db, user.id)
+    # Нужно пополнить баланс — нужна сохранённая карта
     if not saved_methods:
         return 'no_card'
 
@@ -315,8 +435,6 @@ async def _process_single_subscription(
 
         # Успешно — сохраняем локальную запись с привязкой к YooKassa ID
         try:
-            from app.database.crud.yookassa import create_yookassa_payment
-
             yookassa_created_at = None
             if result.get('created_at'):
                 try:
@@ -347,11 +465,9 @@ async def _process_single_subscription(
         except Exception as e:
             logger.warning('Ошибка создания локальной записи рекуррентного платежа', error=e)
 
-        # Уведомляем пользователя
-        if bot and user.telegram_id:
+        # Уведомляем пользователя в фоне, не задерживая обработку следующих подписок
+        if notifier and user.telegram_id:
             try:
-                from app.localization.texts import get_texts
-
                 texts = get_texts(user.language)
                 payment_status = result.get('status', '')
                 if result.get('paid'):
@@ -360,12 +476,7 @@ async def _process_single_subscription(
                         'RECURRENT_TOPUP_SUCCESS',
                         '✅ <b>Автоплатёж выполнен</b>\n\nБаланс пополнен на {amount} для продления подписки.',
                     ).format(amount=settings.format_price(topup_amount_kopeks))
-                    await bot.send_message(
-                        chat_id=user.telegram_id,
-                        text=msg,
-                        parse_mode='HTML',
-                        reply_markup=keyboard,
-                    )
+                    notifier.send(user.telegram_id, msg, keyboard, 'Ошибка уведомления об автоплатеже')
                 elif payment_status == 'pending':
                     logger.info(
                         'Рекуррентный платёж в обработке',
@@ -378,22 +489,15 @@ async def _process_single_subscription(
         return 'created'
 
     # Все карты не сработали — уведомляем пользователя
-    if bot and user.telegram_id:
+    if notifier and user.telegram_id:
         try:
-            from app.localization.texts import get_texts
-
             texts = get_texts(user.language)
             keyboard = _build_extend_keyboard(texts)
             msg = texts.t(
                 'RECURRENT_TOPUP_FAILED',
                 '❌ <b>Автоплатёж не удался</b>\n\nНе удалось списать {amount} ни с одной сохранённой карты для продления подписки.\n\nПополните баланс вручную, чтобы подписка не прервалась.',
             ).format(amount=settings.format_price(topup_amount_kopeks))
-            await bot.send_message(
-                chat_id=user.telegram_id,
-                text=msg,
-                parse_mode='HTML',
-                reply_markup=keyboard,
-            )
+            notifier.send(user.telegram_id, msg, keyboard, 'Ошибка уведомления о неудачном автоплатеже')
         except Exception as notify_error:
             logger.warning('Ошибка уведомления о неудачном автоплатеже', notify_error=notify_error)
 
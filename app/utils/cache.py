@@ -536,3 +536,26 @@ class ChannelSubCache:
     @staticmethod
     async def invalidate_channels() -> None:
         await cache.delete('required_channels:active')
+
+
+class SavedCardsCache:
+    """Short-lived cache of a user's active saved payment methods (cabinet card list).
+
+    Redis key: saved_cards:{user_id} -> JSON list of serialized cards (TTL 30s).
+    Invalidated whenever a card is saved or unlinked.
+    """
+
+    TTL = 30
+
+    @staticmethod
+    async def get_cards(user_id: int) -> list[dict] | None:
+        """Get cached cards. None = cache miss."""
+        return await cache.get(cache_key('saved_cards', user_id))
+
+    @staticmethod
+    async def set_cards(user_id: int, cards: list[dict]) -> None:
+        await cache.set(cache_key('saved_cards', user_id), cards, expire=SavedCardsCache.TTL)
+
+    @staticmethod
+    async def invalidate(user_id: int) -> None:
+        await cache.delete(cache_key('saved_cards', user_id))
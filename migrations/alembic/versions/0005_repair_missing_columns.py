@@ -22,31 +22,21 @@ branch_labels: Union[str, Sequence[str], None] = None
 depends_on: Union[str, Sequence[str], None] = None
 
 
-def _has_column(table: str, column: str) -> bool:
-    conn = op.get_bind()
-    inspector = sa.inspect(conn)
-    return column in [c['name'] for c in inspector.get_columns(table)]
-
-
-def _has_table(table: str) -> bool:
-    conn = op.get_bind()
-    inspector = sa.inspect(conn)
-    return table in inspector.get_table_names()
-
-
-def _has_index(table: str, index_name: str) -> bool:
-    conn = op.get_bind()
-    inspector = sa.inspect(conn)
-    return index_name in [idx['name'] for idx in inspector.get_indexes(table)]
-
+def upgrade() -> None:
+    # Схема читается один раз: каждый sa.inspect() + get_table_names() — отдельный запрос к pg_catalog.
+    # Проверяемые таблицы и колонки не создаются раньше своей проверки, поэтому снимок не устаревает.
+    inspector = sa.inspect(op.get_bind())
+    tables = set(inspector.get_table_names())
+    columns_cache: dict[str, set[str]] = {}
 
-def _has_constraint(table: str, constraint_name: str) -> bool:
-    conn = op.get_bind()
-    inspector = sa.inspect(conn)
-    return constraint_name in [fk['name'] for fk in inspector.get_foreign_keys(table)]
+    def _has_table(table: str) -> bool:
+        return table in tables
 
+    def _has_column(table: str, column: str) -> bool:
+        if table not in columns_cache:
+            columns_cache[table] = {c['name'] for c in inspector.get_columns(table)} if table in tables else set()
+        return column in columns_cache[table]
 
-def upgrade() -> None:
     # --- From 0002: referral_earnings.campaign_id ---
     if _has_table('referral_earnings') and not _has_column('referral_earnings', 'campaign_id'):
         op.add_column('referral_earnings', sa.Column('campaign_id', sa.Integer(), nullable=True))
@@ -0,0 +1,37 @@
+"""add partial index on subscriptions for autopay due lookups
+
+Revision ID: 0050
+Revises: 0049
+Create Date: 2026-10-15
+
+_find_subscriptions_needing_topup filters active subscriptions with
+autopay_enabled by end_date on every monitoring cycle. Most subscriptions
+have autopay disabled, so a partial index over end_date lets PostgreSQL
+range-scan only the autopay rows instead of scanning the whole table.
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = '0050'
+down_revision: str | None = '0049'
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute(
+            sa.text(
+                'CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_subscriptions_autopay_due '
+                'ON subscriptions (end_date) '
+                "WHERE status = 'active' AND autopay_enabled = true"
+            )
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute(sa.text('DROP INDEX CONCURRENTLY IF EXISTS ix_subscriptions_autopay_due'))
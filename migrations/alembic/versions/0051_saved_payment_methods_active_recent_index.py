@@ -0,0 +1,44 @@
+"""replace saved_payment_methods (user_id, is_active) index with a partial recency index
+
+Revision ID: 0051
+Revises: 0050
+Create Date: 2026-10-15
+
+get_active_payment_methods_by_user filters by user_id AND is_active = true
+and orders by created_at DESC. The (user_id, is_active) index still needs a
+sort step; a partial index on (user_id, created_at DESC) WHERE is_active
+returns the user's cards already ordered, newest first.
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = '0051'
+down_revision: str | None = '0050'
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute(
+            sa.text(
+                'CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_saved_payment_methods_user_active_recent '
+                'ON saved_payment_methods (user_id, created_at DESC) '
+                'WHERE is_active = true'
+            )
+        )
+        op.execute(sa.text('DROP INDEX CONCURRENTLY IF EXISTS ix_saved_payment_methods_user_active'))
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute(
+            sa.text(
+                'CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_saved_payment_methods_user_active '
+                'ON saved_payment_methods (user_id, is_active)'
+            )
+        )
+        op.execute(sa.text('DROP INDEX CONCURRENTLY IF EXISTS ix_saved_payment_methods_user_active_recent'))
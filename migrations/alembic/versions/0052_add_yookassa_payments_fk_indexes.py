@@ -0,0 +1,43 @@
+"""index yookassa_payments foreign keys
+
+Revision ID: 0052
+Revises: 0051
+Create Date: 2026-10-15
+
+Postgres does not index foreign key columns automatically. user_id is used
+for the user's payment history (ordered by created_at DESC) and by the
+ON DELETE CASCADE from users; transaction_id is checked when transactions
+are deleted. Both columns were unindexed and required sequential scans.
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = '0052'
+down_revision: str | None = '0051'
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute(
+            sa.text(
+                'CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_yookassa_payments_user_created '
+                'ON yookassa_payments (user_id, created_at DESC)'
+            )
+        )
+        op.execute(
+            sa.text(
+                'CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_yookassa_payments_transaction_id '
+                'ON yookassa_payments (transaction_id)'
+            )
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute(sa.text('DROP INDEX CONCURRENTLY IF EXISTS ix_yookassa_payments_transaction_id'))
+        op.execute(sa.text('DROP INDEX CONCURRENTLY IF EXISTS ix_yookassa_payments_user_created'))
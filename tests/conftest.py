@@ -61,10 +61,17 @@ if 'redis.asyncio' not in sys.modules:
     def _from_url(url):
         return _FakeRedisClient()
 
+    redis_exceptions_module = types.ModuleType('redis.exceptions')
+
+    class _FakeNoScriptError(Exception):
+        pass
+
     redis_async_module.from_url = _from_url
     redis_async_module.Redis = _FakeRedisClient
+    redis_exceptions_module.NoScriptError = _FakeNoScriptError
     sys.modules['redis'] = redis_module
     sys.modules['redis.asyncio'] = redis_async_module
+    sys.modules['redis.exceptions'] = redis_exceptions_module
 
 # Минимальная реализация SDK YooKassa, чтобы импорт сервисов не падал.
 if 'yookassa' not in sys.modules:
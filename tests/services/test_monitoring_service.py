@@ -0,0 +1,123 @@
+"""Тесты службы мониторинга."""
+
+import asyncio
+from unittest.mock import MagicMock
+
+import pytest
+
+import app.services.payment_service as payment_service_module
+from app.config import settings
+from app.services.monitoring_service import MonitoringService, _next_run_deadline
+
+
+class _FakePaymentService:
+    instances: list['_FakePaymentService'] = []
+
+    def __init__(self, bot=None):
+        self.bot = bot
+        self.yookassa_service = MagicMock(configured=bool(settings.YOOKASSA_SHOP_ID and settings.YOOKASSA_SECRET_KEY))
+        _FakePaymentService.instances.append(self)
+
+
+@pytest.fixture
+def monitoring(monkeypatch):
+    _FakePaymentService.instances = []
+    monkeypatch.setattr(payment_service_module, 'PaymentService', _FakePaymentService)
+    monkeypatch.setattr(settings, 'YOOKASSA_SHOP_ID', 'shop')
+    monkeypatch.setattr(settings, 'YOOKASSA_SECRET_KEY', 'secret')
+    return MonitoringService(bot=MagicMock())
+
+
+def test_recurrent_payment_service_is_reused(monitoring):
+    first = monitoring._get_recurrent_payment_service()
+
+    assert monitoring._get_recurrent_payment_service() is first
+    assert len(_FakePaymentService.instances) == 1
+
+
+def test_recurrent_payment_service_rebuilt_on_bot_change(monitoring):
+    first = monitoring._get_recurrent_payment_service()
+    monitoring.bot = MagicMock()
+
+    second = monitoring._get_recurrent_payment_service()
+
+    assert second is not first
+    assert second.bot is monitoring.bot
+
+
+def test_recurrent_payment_service_rebuilt_on_credentials_change(monkeypatch, monitoring):
+    first = monitoring._get_recurrent_payment_service()
+    monkeypatch.setattr(settings, 'YOOKASSA_SECRET_KEY', 'rotated')
+
+    assert monitoring._get_recurrent_payment_service() is not first
+
+
+def test_recurrent_payment_service_rebuilt_while_yookassa_not_configured(monkeypatch, monitoring):
+    monkeypatch.setattr(settings, 'YOOKASSA_SHOP_ID', '')
+    unconfigured = monitoring._get_recurrent_payment_service()
+    assert not unconfigured.yookassa_service.configured
+
+    # Реквизиты заполнены через настройки во время работы бота
+    monkeypatch.setattr(settings, 'YOOKASSA_SHOP_ID', 'shop')
+    configured = monitoring._get_recurrent_payment_service()
+
+    assert configured is not unconfigured
+    assert configured.yookassa_service.configured
+    assert monitoring._get_recurrent_payment_service() is configured
+
+
+def test_next_run_deadline_keeps_fixed_grid():
+    # Цикл уложился в интервал — следующий запуск ровно через интервал от предыдущего
+    assert _next_run_deadline(100.0, now=130.0, interval_seconds=60) == 160.0
+
+
+def test_next_run_deadline_skips_missed_runs():
+    # Цикл длился 150 секунд при интервале 60 — пропущенные запуски не догоняем
+    assert _next_run_deadline(100.0, now=250.0, interval_seconds=60) == 280.0
+
+
+def test_next_run_deadline_on_grid_boundary():
+    assert _next_run_deadline(100.0, now=160.0, interval_seconds=60) == 160.0
+
+
+async def test_restart_during_cycle_does_not_leave_two_loops(monkeypatch):
+    monkeypatch.setattr(settings, 'MONITORING_INTERVAL', 60)
+    service = MonitoringService(bot=MagicMock())
+
+    async def idle_sla_loop():
+        await asyncio.Event().wait()
+
+    monkeypatch.setattr(service, '_sla_loop', idle_sla_loop)
+
+    release_first_cycle = asyncio.Event()
+    cycles: list[str] = []
+
+    async def fake_cycle():
+        cycles.append('start')
+        if len(cycles) == 1:
+            await release_first_cycle.wait()
+        cycles.append('end')
+
+    monkeypatch.setattr(service, '_monitoring_cycle', fake_cycle)
+
+    first_loop = asyncio.create_task(service.start_monitoring())
+    await asyncio.sleep(0)
+    assert cycles == ['start']
+
+    # Остановка и повторный запуск, пока первый цикл ещё идёт
+    service.stop_monitoring()
+    second_loop = asyncio.create_task(service.start_monitoring())
+    await asyncio.sleep(0)
+    # Новый цикл не стартует параллельно с незавершённым
+    assert cycles == ['start']
+
+    release_first_cycle.set()
+    await asyncio.wait_for(first_loop, timeout=1)
+    await asyncio.sleep(0)
+
+    assert cycles == ['start', 'end', 'start', 'end']
+    assert not second_loop.done()
+
+    service.stop_monitoring()
+    await asyncio.wait_for(second_loop, timeout=1)
+    assert cycles == ['start', 'end', 'start', 'end']
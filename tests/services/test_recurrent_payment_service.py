@@ -0,0 +1,217 @@
+"""Тесты сервиса рекуррентных автоплатежей."""
+
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import UTC, datetime, timedelta
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+import app.services.recurrent_payment_service as recurrent_module
+from app.config import settings
+
+
+def _make_subscription(idx: int) -> MagicMock:
+    user = MagicMock()
+    user.id = idx
+    subscription = MagicMock()
+    subscription.id = 100 + idx
+    subscription.user_id = idx
+    subscription.user = user
+    return subscription
+
+
+def _make_db() -> MagicMock:
+    db = MagicMock()
+    db.commit = AsyncMock()
+    return db
+
+
+def _batches(*batches):
+    async def fake_iter(db):
+        for batch in batches:
+            yield batch
+
+    return fake_iter
+
+
+@pytest.fixture
+def recurrent_env(monkeypatch):
+    monkeypatch.setattr(settings, 'YOOKASSA_RECURRENT_ENABLED', True)
+    monkeypatch.setattr(settings, 'YOOKASSA_ENABLED', True)
+    monkeypatch.setattr(settings, 'ENABLE_AUTOPAY', True)
+    monkeypatch.setattr(recurrent_module, '_daily_guard', recurrent_module._DailyGuard())
+
+    monkeypatch.setattr(recurrent_module, 'PaymentService', MagicMock())
+    monkeypatch.setattr(recurrent_module, 'SubscriptionService', MagicMock())
+
+    sessions: list[MagicMock] = []
+
+    @asynccontextmanager
+    async def fake_session_factory():
+        session = MagicMock()
+        sessions.append(session)
+        yield session
+
+    monkeypatch.setattr(recurrent_module, 'AsyncSessionLocal', fake_session_factory)
+    monkeypatch.setattr(recurrent_module, 'get_active_payment_methods_by_users', AsyncMock(return_value={}))
+    return sessions
+
+
+async def test_process_recurrent_payments_bounds_concurrency(monkeypatch, recurrent_env):
+    monkeypatch.setattr(settings, 'YOOKASSA_RECURRENT_CONCURRENCY', 2)
+    subscriptions = [_make_subscription(i) for i in range(6)]
+    monkeypatch.setattr(recurrent_module, '_iter_subscriptions_needing_topup', _batches(subscriptions))
+
+    in_flight = 0
+    max_in_flight = 0
+    used_sessions = []
+
+    async def fake_process(db, subscription, user, *args):
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        used_sessions.append(db)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return 'created'
+
+    monkeypatch.setattr(recurrent_module, '_process_single_subscription', fake_process)
+
+    stats = await recurrent_module.process_recurrent_payments(_make_db())
+
+    assert stats['checked'] == 6
+    assert stats['payments_created'] == 6
+    assert max_in_flight == 2
+    # Каждая подписка обрабатывается в собственной сессии
+    assert len({id(db) for db in used_sessions}) == 6
+
+
+async def test_process_recurrent_payments_counts_failed_tasks(monkeypatch, recurrent_env):
+    subscriptions = [_make_subscription(i) for i in range(3)]
+    monkeypatch.setattr(recurrent_module, '_iter_subscriptions_needing_topup', _batches(subscriptions))
+
+    async def fake_process(db, subscription, user, *args):
+        if subscription.id == 101:
+            raise RuntimeError('boom')
+        return 'no_card'
+
+    monkeypatch.setattr(recurrent_module, '_process_single_subscription', fake_process)
+
+    stats = await recurrent_module.process_recurrent_payments(_make_db())
+
+    assert stats['errors'] == 1
+    assert stats['insufficient_no_card'] == 2
+    assert recurrent_module._daily_guard.is_processed('0_100')
+    assert not recurrent_module._daily_guard.is_processed('1_101')
+
+
+async def test_process_recurrent_payments_handles_batches(monkeypatch, recurrent_env):
+    first, second = [_make_subscription(i) for i in range(2)], [_make_subscription(i) for i in range(2, 3)]
+    monkeypatch.setattr(recurrent_module, '_iter_subscriptions_needing_topup', _batches(first, second))
+    monkeypatch.setattr(recurrent_module, '_process_single_subscription', AsyncMock(return_value='created'))
+
+    stats = await recurrent_module.process_recurrent_payments(_make_db())
+
+    assert stats['checked'] == 3
+    assert stats['payments_created'] == 3
+
+
+async def test_iter_subscriptions_needing_topup_uses_keyset_pagination(monkeypatch):
+    monkeypatch.setattr(recurrent_module, '_TOPUP_BATCH_SIZE', 2)
+    end_date = datetime(2024, 1, 1, tzinfo=UTC)
+    pages = [
+        [MagicMock(id=1, end_date=end_date), MagicMock(id=2, end_date=end_date)],
+        [MagicMock(id=3, end_date=end_date)],
+    ]
+
+    def make_result(page):
+        result = MagicMock()
+        result.scalars.return_value.all.return_value = page
+        return result
+
+    db = MagicMock()
+    db.execute = AsyncMock(side_effect=[make_result(page) for page in pages])
+
+    batches = [batch async for batch in recurrent_module._iter_subscriptions_needing_topup(db)]
+
+    assert [[s.id for s in batch] for batch in batches] == [[1, 2], [3]]
+    # Неполная пачка — последняя, лишнего запроса нет
+    assert db.execute.await_count == 2
+    first_query, second_query = (call.args[0] for call in db.execute.await_args_list)
+    assert '(subscriptions.end_date, subscriptions.id) >' not in str(first_query)
+    assert '(subscriptions.end_date, subscriptions.id) >' in str(second_query)
+
+
+async def test_process_recurrent_payments_reuses_given_payment_service(monkeypatch, recurrent_env):
+    payment_service_factory = MagicMock()
+    monkeypatch.setattr(recurrent_module, 'PaymentService', payment_service_factory)
+    monkeypatch.setattr(recurrent_module, '_iter_subscriptions_needing_topup', _batches([_make_subscription(0)]))
+    process = AsyncMock(return_value='created')
+    monkeypatch.setattr(recurrent_module, '_process_single_subscription', process)
+    payment_service = MagicMock()
+
+    await recurrent_module.process_recurrent_payments(_make_db(), payment_service=payment_service)
+
+    payment_service_factory.assert_not_called()
+    assert process.await_args.args[4] is payment_service
+
+
+async def test_process_recurrent_payments_flushes_background_notifications(monkeypatch, recurrent_env):
+    monkeypatch.setattr(recurrent_module, '_NOTIFY_DELAY_SECONDS', 0)
+    monkeypatch.setattr(recurrent_module, '_iter_subscriptions_needing_topup', _batches([_make_subscription(0)]))
+    sent_before_return = []
+
+    async def fake_process(db, subscription, user, notifier, *args):
+        notifier.send(user.id, 'text', MagicMock(), 'error')
+        sent_before_return.append(bot.send_message.await_count)
+        return 'created'
+
+    monkeypatch.setattr(recurrent_module, '_process_single_subscription', fake_process)
+    bot = MagicMock()
+    bot.send_message = AsyncMock()
+
+    await recurrent_module.process_recurrent_payments(_make_db(), bot=bot)
+
+    # Обработка подписки не ждёт отправки, но цикл дожидается её перед завершением
+    assert sent_before_return == [0]
+    bot.send_message.assert_awaited_once()
+
+
+async def test_process_batch_ends_read_transaction_before_dispatch(monkeypatch, recurrent_env):
+    db = _make_db()
+    monkeypatch.setattr(recurrent_module, '_iter_subscriptions_needing_topup', _batches([_make_subscription(0)]))
+    committed_before_processing = []
+
+    async def fake_process(*args):
+        committed_before_processing.append(db.commit.await_count)
+        return 'created'
+
+    monkeypatch.setattr(recurrent_module, '_process_single_subscription', fake_process)
+
+    await recurrent_module.process_recurrent_payments(db)
+
+    assert committed_before_processing == [1]
+
+
+async def test_iter_subscriptions_needing_topup_keeps_constant_end_date_bound(monkeypatch):
+    monkeypatch.setattr(settings, 'DEFAULT_AUTOPAY_DAYS_BEFORE', 3)
+    result = MagicMock()
+    result.scalars.return_value.all.return_value = []
+    db = MagicMock()
+    db.execute = AsyncMock(return_value=result)
+
+    batches = [batch async for batch in recurrent_module._iter_subscriptions_needing_topup(db)]
+
+    assert batches == []
+    query = db.execute.await_args.args[0]
+    compiled = query.compile(compile_kwargs={'literal_binds': False})
+    # Постоянная граница (не зависит от колонок строки) — по ней сканируется индекс end_date
+    horizons = [
+        value
+        for key, value in compiled.params.items()
+        if key.startswith('end_date') and isinstance(value, datetime) and value > datetime.now(UTC)
+    ]
+    assert len(horizons) == 1
+    assert horizons[0] - datetime.now(UTC) > timedelta(days=3, hours=23)
+    assert horizons[0] - datetime.now(UTC) <= timedelta(days=4)
@@ -0,0 +1,87 @@
+"""Тесты кеша сохранённых карт и его инвалидации."""
+
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+import app.cabinet.routes.balance as balance_module
+import app.database.crud.saved_payment_method as saved_payment_method_crud
+import app.handlers.subscription.autopay as autopay_module
+from app.config import settings
+from app.services.payment.yookassa import YooKassaPaymentMixin
+from app.utils.cache import SavedCardsCache
+
+
+@pytest.fixture
+def invalidate(monkeypatch) -> AsyncMock:
+    mock = AsyncMock()
+    monkeypatch.setattr(SavedCardsCache, 'invalidate', mock)
+    return mock
+
+
+async def test_get_saved_cards_returns_cached_list_without_db_query(monkeypatch):
+    monkeypatch.setattr(settings, 'YOOKASSA_RECURRENT_ENABLED', True)
+    cached = [
+        {
+            'id': 7,
+            'method_type': 'bank_card',
+            'card_last4': '4242',
+            'card_type': 'Visa',
+            'title': 'Visa *4242',
+            'created_at': '2026-01-01T00:00:00Z',
+        }
+    ]
+    monkeypatch.setattr(SavedCardsCache, 'get_cards', AsyncMock(return_value=cached))
+    set_cards = AsyncMock()
+    monkeypatch.setattr(SavedCardsCache, 'set_cards', set_cards)
+    db_lookup = AsyncMock()
+    monkeypatch.setattr(balance_module, 'get_active_payment_methods_by_user', db_lookup)
+
+    response = await balance_module.get_saved_cards(user=SimpleNamespace(id=1), db=MagicMock())
+
+    db_lookup.assert_not_awaited()
+    set_cards.assert_not_awaited()
+    assert [card.id for card in response.cards] == [7]
+    assert response.recurrent_enabled is True
+
+
+async def test_delete_saved_card_invalidates_cache(monkeypatch, invalidate):
+    monkeypatch.setattr(settings, 'YOOKASSA_RECURRENT_ENABLED', True)
+    monkeypatch.setattr(balance_module, 'deactivate_payment_method', AsyncMock(return_value=True))
+
+    await balance_module.delete_saved_card(card_id=7, user=SimpleNamespace(id=1), db=MagicMock())
+
+    invalidate.assert_awaited_once_with(1)
+
+
+async def test_confirm_unlink_invalidates_cache(monkeypatch, invalidate):
+    monkeypatch.setattr(autopay_module, 'deactivate_payment_method', AsyncMock(return_value=True))
+    monkeypatch.setattr(autopay_module, 'handle_saved_cards_list', AsyncMock())
+    callback = MagicMock()
+    callback.data = 'confirm_unlink_card_7'
+    callback.answer = AsyncMock()
+
+    await autopay_module.handle_confirm_unlink(callback, SimpleNamespace(id=1, language='ru'), MagicMock())
+
+    invalidate.assert_awaited_once_with(1)
+
+
+async def test_saving_yookassa_payment_method_invalidates_cache(monkeypatch, invalidate):
+    monkeypatch.setattr(saved_payment_method_crud, 'get_payment_method_by_yookassa_id', AsyncMock(return_value=None))
+    monkeypatch.setattr(
+        saved_payment_method_crud, 'create_saved_payment_method', AsyncMock(return_value=SimpleNamespace(id=7))
+    )
+    payment = SimpleNamespace(user_id=1, yookassa_payment_id='yk_1')
+    event_object = {
+        'payment_method': {
+            'id': 'pm_1',
+            'saved': True,
+            'type': 'bank_card',
+            'card': {'last4': '4242', 'card_type': 'Visa'},
+        }
+    }
+
+    await YooKassaPaymentMixin._save_payment_method_if_available(MagicMock(), MagicMock(), payment, event_object)
+
+    invalidate.assert_awaited_once_with(1)